@@ -1,6 +1,5 @@
 import os
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
@@ -8,146 +7,194 @@ from utils.hv_calculator import calculate_historical_volatility
 from utils.iv_simulator import simulate_implied_volatility
 from utils.payoff_calculator import simulate_straddle_payoff
 from utils.performance_metrics import compute_all_metrics
+from utils.report_plots import plot_equity_curve
 from utils.strategy_rules import generate_volatility_signals
 
-np.random.seed(42)
 from utils.performance_metrics import annualized_volatility, compute_all_metrics
 
 TARGET_ANN_VOL = 0.25  # 25% target annual vol
 
 
-# ----------- 1. Load Data -------------------
-df = pd.read_csv("data/spot_data.csv", parse_dates=["Date"])
-df.set_index("Date", inplace=True)
-close_prices = df["Close"]
-
-# ----------- 2. Compute HV and Simulate IV ------------
-hv_20 = calculate_historical_volatility(close_prices, window=20)
-iv_sim = simulate_implied_volatility(hv_20, mode="random")
-
-# ----------- 3. Generate Signals -------------
-signals = generate_volatility_signals(iv_sim, hv_20)
-
-# ----------- 4. Simulate PnL ---------------
-results = simulate_straddle_payoff(
-    price_series=close_prices,
-    signals=signals,
-    hold_period=5,
-    premium_pct=0.03,  # if you’re still using mock IV
-    commission_pct=0.001,  # 0.1% round-trip
-    slippage_pct=0.0005,  # 0.05% per leg
-    stop_loss_pct=1.5,  # allow full premium loss before stop
-    profit_target_pct=0.05,
-)
-
-results["cum_pnl"] = results["pnl"].cumsum()
-# ─── Scale PnL to Target Annual Volatility ───────────────────
-current_ann_vol = annualized_volatility(results["pnl"])
-scale_factor = TARGET_ANN_VOL / current_ann_vol
-print(f"🔧 Scaling factor to reach {TARGET_ANN_VOL*100:.0f}% vol: {scale_factor:.6f}")
-
-# Apply scaling
-results["pnl_scaled"] = results["pnl"] * scale_factor
-results["cum_pnl_scaled"] = results["pnl_scaled"].cumsum()
-
-# Compute scaled metrics
-scaled_df = results.rename(columns={"pnl_scaled": "pnl", "cum_pnl_scaled": "cum_pnl"})[
-    ["date", "pnl", "cum_pnl"]
-]
-metrics_scaled = compute_all_metrics(scaled_df)
-
-# Scale PnL so that annualized volatility ≈ TARGET_ANN_VOL
-current_ann_vol = annualized_volatility(results["pnl"])
-scale_factor = TARGET_ANN_VOL / current_ann_vol
-print(f"🔧 Scaling factor to reach {TARGET_ANN_VOL*100:.0f}% vol: {scale_factor:.6f}")
-
-# apply scaling
-results["pnl_scaled"] = results["pnl"] * scale_factor
-results["cum_pnl_scaled"] = results["pnl_scaled"].cumsum()
-
-# compute scaled metrics
-scaled_df = results.rename(columns={"pnl_scaled": "pnl", "cum_pnl_scaled": "cum_pnl"})[
-    ["date", "pnl", "cum_pnl"]
-]
-metrics_scaled = compute_all_metrics(scaled_df)
-
-# ----------- 5. Plot Equity Curve ----------
-plt.figure(figsize=(12, 6))
-plt.plot(results["date"], results["cum_pnl"], label="Equity Curve", color="purple")
-plt.title("Cumulative PnL from IV-HV Divergence Strategy")
-plt.grid()
-plt.legend()
-plt.tight_layout()
-plt.savefig("outputs/equity_curve.png")
-# plt.show()
-
-print("✅ Backtest complete. Calculating stats...")
-
-# ——— Compute & Save Metrics ————————————
-metrics = compute_all_metrics(results)
-
-with open("outputs/strategy_stats.txt", "w") as f:
+def main():
+    np.random.seed(42)
+
+    # ----------- 1. Load Data -------------------
+    df = pd.read_csv("data/spot_data.csv", parse_dates=["Date"])
+    df.set_index("Date", inplace=True)
+    close_prices = df["Close"]
+
+    # ----------- 2. Compute HV and Simulate IV ------------
+    hv_20 = calculate_historical_volatility(close_prices, window=20)
+    iv_sim = simulate_implied_volatility(hv_20, mode="random")
+
+    # ----------- 3. Generate Signals -------------
+    signals = generate_volatility_signals(iv_sim, hv_20)
+
+    # ----------- 4. Simulate PnL ---------------
+    results = simulate_straddle_payoff(
+        price_series=close_prices,
+        signals=signals,
+        hold_period=5,
+        premium_pct=0.03,  # if you’re still using mock IV
+        commission_pct=0.001,  # 0.1% round-trip
+        slippage_pct=0.0005,  # 0.05% per leg
+        stop_loss_pct=1.5,  # allow full premium loss before stop
+        profit_target_pct=0.05,
+    )
+
+    results["cum_pnl"] = results["pnl"].cumsum()
+    # ─── Scale PnL to Target Annual Volatility ───────────────────
+    current_ann_vol = annualized_volatility(results["pnl"])
+    scale_factor = TARGET_ANN_VOL / current_ann_vol
+    print(
+        f"🔧 Scaling factor to reach {TARGET_ANN_VOL*100:.0f}% vol: {scale_factor:.6f}"
+    )
+
+    # Apply scaling
+    results["pnl_scaled"] = results["pnl"] * scale_factor
+    results["cum_pnl_scaled"] = results["pnl_scaled"].cumsum()
+
+    # Compute scaled metrics
+    scaled_df = results.rename(
+        columns={"pnl_scaled": "pnl", "cum_pnl_scaled": "cum_pnl"}
+    )[["date", "pnl", "cum_pnl"]]
+    metrics_scaled = compute_all_metrics(scaled_df)
+
+    # Scale PnL so that annualized volatility ≈ TARGET_ANN_VOL
+    current_ann_vol = annualized_volatility(results["pnl"])
+    scale_factor = TARGET_ANN_VOL / current_ann_vol
+    print(
+        f"🔧 Scaling factor to reach {TARGET_ANN_VOL*100:.0f}% vol: {scale_factor:.6f}"
+    )
+
+    # apply scaling
+    results["pnl_scaled"] = results["pnl"] * scale_factor
+    results["cum_pnl_scaled"] = results["pnl_scaled"].cumsum()
+
+    # compute scaled metrics
+    scaled_df = results.rename(
+        columns={"pnl_scaled": "pnl", "cum_pnl_scaled": "cum_pnl"}
+    )[["date", "pnl", "cum_pnl"]]
+    metrics_scaled = compute_all_metrics(scaled_df)
+
+    # ----------- 5. Plot Equity Curve ----------
+    plot_equity_curve(results["date"], results["cum_pnl"], "outputs/equity_curve.png")
+
+    print("✅ Backtest complete. Calculating stats...")
+
+    # ——— Compute & Save Metrics ————————————
+    metrics = compute_all_metrics(results)
+
+    with open("outputs/strategy_stats.txt", "w") as f:
+        for name, val in metrics.items():
+            if isinstance(val, float):
+                f.write(f"{name:22}: {val:.4f}\n")
+            else:
+                f.write(f"{name:22}: {val}\n")
+
+    # ——— Print Summary to Console ——————————
+    print("\n📊 Performance Metrics")
     for name, val in metrics.items():
         if isinstance(val, float):
-            f.write(f"{name:22}: {val:.4f}\n")
+            print(f"{name:22}: {val:.4f}")
         else:
-            f.write(f"{name:22}: {val}\n")
-
-# ——— Print Summary to Console ——————————
-print("\n📊 Performance Metrics")
-for name, val in metrics.items():
-    if isinstance(val, float):
-        print(f"{name:22}: {val:.4f}")
-    else:
-        print(f"{name:22}: {val}")
-
-results.to_csv("outputs/trades_summary.csv", index=False)
-
-# import itertools
-
-# import pandas as pd
-
-# # ─── FULL PARAM GRID ─────────────────────────────────────────
-# upper_list = [1.1, 1.2, 1.3]
-# lower_list = [0.6, 0.7, 0.8]
-# stop_list = [0.5, 1.0, 1.5]
-# profit_target_list = [0.05, 0.1, 0.2]
-
-# records = []
-# for upper, lower, stop, profit in itertools.product(
-#     upper_list, lower_list, stop_list, profit_target_list
-# ):
-
-#     sigs = generate_volatility_signals(
-#         iv_sim, hv_20, upper_thresh=upper, lower_thresh=lower
-#     )
-
-#     trades = simulate_straddle_payoff(
-#         price_series=close_prices,
-#         signals=sigs,
-#         hold_period=5,
-#         premium_pct=0.03,
-#         commission_pct=0.001,
-#         slippage_pct=0.0005,
-#         stop_loss_pct=stop,
-#         profit_target_pct=profit,
-#     )
-#     trades["cum_pnl"] = trades["pnl"].cumsum()
-#     m = compute_all_metrics(trades)
-
-#     records.append(
-#         {
-#             "upper": upper,
-#             "lower": lower,
-#             "stop_loss_pct": stop,
-#             "profit_target_pct": profit,
-#             "Sharpe": m["Sharpe Ratio"],
-#             "TotalRet": m["Total Return"],
-#             "MaxDraw": m["Max Drawdown"],
-#             "WinRate": m["Win Rate"],
-#         }
-#     )
-
-# grid_df = pd.DataFrame(records)
-# grid_df.to_csv("outputs/param_grid_full.csv", index=False)
-# print("✅ Full grid search complete. See outputs/param_grid_full.csv")
+            print(f"{name:22}: {val}")
+
+    results.to_csv("outputs/trades_summary.csv", index=False)
+
+    # from utils.results_store import (
+    #     METRIC_COLUMNS,
+    #     compute_data_hash,
+    #     new_run_id,
+    #     open_results_store,
+    #     query_top,
+    #     run_resumable_grid,
+    # )
+
+    # # ─── FULL PARAM GRID ─────────────────────────────────────────
+    # # Each combination is checkpointed to outputs/param_grid_results.sqlite as it
+    # # completes; re-running after a crash skips combinations already stored.
+    # grid_config = {
+    #     "hold_period": 5,
+    #     "premium_pct": 0.03,
+    #     "commission_pct": 0.001,
+    #     "slippage_pct": 0.0005,
+    # }
+    # param_grid = {
+    #     "upper": [1.1, 1.2, 1.3],
+    #     "lower": [0.6, 0.7, 0.8],
+    #     "stop_loss_pct": [0.5, 1.0, 1.5],
+    #     "profit_target_pct": [0.05, 0.1, 0.2],
+    # }
+
+    # def evaluate_params(p):
+    #     sigs = generate_volatility_signals(
+    #         iv_sim, hv_20, upper_thresh=p["upper"], lower_thresh=p["lower"]
+    #     )
+
+    #     trades = simulate_straddle_payoff(
+    #         price_series=close_prices,
+    #         signals=sigs,
+    #         stop_loss_pct=p["stop_loss_pct"],
+    #         profit_target_pct=p["profit_target_pct"],
+    #         **grid_config,
+    #     )
+    #     trades["cum_pnl"] = trades["pnl"].cumsum()
+    #     m = compute_all_metrics(trades)
+
+    #     return {
+    #         "Sharpe": m["Sharpe Ratio"],
+    #         "TotalRet": m["Total Return"],
+    #         "MaxDraw": m["Max Drawdown"],
+    #         "WinRate": m["Win Rate"],
+    #     }
+
+    # store = open_results_store()
+    # data_hash = compute_data_hash(pd.concat([close_prices, iv_sim], axis=1))
+    # run_resumable_grid(
+    #     store, new_run_id(), data_hash, param_grid, evaluate_params, config=grid_config
+    # )
+
+    # grid_df = query_top(
+    #     store, metric="Sharpe", n=None, data_hash=data_hash, config=grid_config
+    # )
+    # # same layout as before: grid order, params then metrics
+    # grid_df.sort_values(list(param_grid))[
+    #     list(param_grid) + list(METRIC_COLUMNS)
+    # ].to_csv("outputs/param_grid_full.csv", index=False)
+    # print(
+    #     query_top(
+    #         store,
+    #         metric="Sharpe",
+    #         n=5,
+    #         max_drawdown=2500,
+    #         data_hash=data_hash,
+    #         config=grid_config,
+    #     )
+    # )
+    # print("✅ Full grid search complete. See outputs/param_grid_full.csv")
+
+    # from utils.report_plots import plot_param_heatmap, render_reports_parallel
+
+    # # Workers only import this module; the backtest runs under the main guard.
+    # render_reports_parallel(
+    #     [
+    #         (
+    #             plot_equity_curve,
+    #             {
+    #                 "dates": results["date"],
+    #                 "cum_pnl": results["cum_pnl_scaled"],
+    #                 "out_path": "outputs/equity_curve_scaled.png",
+    #                 "title": "Vol-Scaled Cumulative PnL",
+    #             },
+    #         ),
+    #         (
+    #             plot_param_heatmap,
+    #             {"grid_df": grid_df, "out_path": "outputs/param_heatmap_sharpe.png"},
+    #         ),
+    #     ]
+    # )
+
+
+if __name__ == "__main__":
+    main()
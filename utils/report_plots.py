@@ -0,0 +1,306 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection
+
+DEFAULT_MAX_POINTS = 2000
+
+
+# --------📉 Downsampling --------
+def _is_numeric(x):
+    return np.asarray(x).dtype.kind in "biuf"
+
+
+def _as_datetime(x):
+    """
+    Naive DatetimeIndex for any date-like x-axis: datetime64, datetime.date
+    objects or tz-aware timestamps (kept at their local wall time).
+    """
+    idx = pd.DatetimeIndex(pd.to_datetime(pd.Series(list(x)) if len(x) else []))
+    return idx.tz_localize(None) if idx.tz is not None else idx
+
+
+def _as_numeric(x):
+    """Float view of an x-axis (datetimes become ns since epoch)."""
+    if _is_numeric(x):
+        return np.asarray(x, dtype=float)
+    return _as_datetime(x).asi8.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: picks `n_out` points that keep the visual
+    shape of the curve (peaks and troughs survive, flat stretches collapse).
+
+    Parameters:
+    - x, y: array-likes of equal length (x may be datetimes)
+    - n_out: number of points to keep (first and last always kept)
+
+    Returns:
+    - np.ndarray of selected indices, ascending
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_numeric(x)
+
+    every = (n - 2) / (n_out - 2)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+
+    for i in range(n_out - 2):
+        # average of the next bucket is the third triangle vertex
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        idx[i + 1] = a
+
+    return idx
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Min/max bucketing: keeps the lowest and highest point of each of
+    `n_buckets` equal-width buckets (at most 2 * n_buckets points).
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        chunk = y[start:end]
+        if not np.isfinite(chunk).any():
+            continue
+        keep.append(start + int(np.nanargmin(chunk)))
+        keep.append(start + int(np.nanargmax(chunk)))
+
+    return np.unique(keep)
+
+
+def downsample_series(x, y, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+    """
+    Reduces (x, y) to at most ~max_points before plotting.
+
+    Parameters:
+    - method: "lttb" or "minmax"
+
+    Returns:
+    - (x_ds, y_ds) as np.ndarrays
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if method == "lttb":
+        idx = lttb_indices(x, y, max_points)
+    elif method == "minmax":
+        idx = minmax_indices(y, max_points // 2)
+    else:
+        raise ValueError("Invalid method. Use 'lttb' or 'minmax'.")
+    return x[idx], y[idx]
+
+
+# --------🖼 Figures --------
+def _save(fig, out_path):
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(out_path)
+    plt.close(fig)
+    return out_path
+
+
+def plot_equity_curve(
+    dates,
+    cum_pnl,
+    out_path,
+    title="Cumulative PnL from IV-HV Divergence Strategy",
+    label="Equity Curve",
+    color="purple",
+    max_points=DEFAULT_MAX_POINTS,
+    method="lttb",
+):
+    """Downsampled single equity curve saved to `out_path`."""
+    x, y = downsample_series(dates, cum_pnl, max_points, method)
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(x, y, label=label, color=color)
+    ax.set_title(title)
+    ax.grid()
+    ax.legend()
+    return _save(fig, out_path)
+
+
+def plot_equity_curves(
+    curves,
+    out_path,
+    title="Equity Curves across Parameter Sweep",
+    max_points=500,
+    method="lttb",
+    alpha=0.3,
+):
+    """
+    Many equity curves (e.g. one per sweep combination) drawn as a single
+    LineCollection instead of one `plot` call per curve.
+
+    Parameters:
+    - curves: iterable of pd.Series (index = date/step, values = cum PnL)
+    """
+    segments, is_dates = [], False
+    for curve in curves:
+        x, y = downsample_series(curve.index, curve.values, max_points, method)
+        if not _is_numeric(x):
+            x, is_dates = mdates.date2num(_as_datetime(x)), True
+        segments.append(np.column_stack([np.asarray(x, dtype=float), y]))
+    if not segments:
+        raise ValueError("No curves to plot")
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.add_collection(LineCollection(segments, linewidths=0.8, alpha=alpha))
+    ax.autoscale()
+    if is_dates:
+        ax.xaxis_date()
+    ax.set_title(title)
+    ax.grid()
+    return _save(fig, out_path)
+
+
+def plot_mc_fan(
+    paths,
+    out_path,
+    percentiles=(5, 25, 50, 75, 95),
+    title="Monte Carlo Equity Fan",
+    color="purple",
+    max_points=DEFAULT_MAX_POINTS,
+    bands=None,
+):
+    """
+    Fan chart of simulated equity paths.
+
+    Parameters:
+    - paths: array of shape (n_paths, n_steps), or None when `bands` is given
+    - percentiles: symmetric, ascending; the middle one is drawn as a line
+    - bands: optional precomputed percentiles, shape (len(percentiles), n_steps),
+      so large Monte Carlo runs can be aggregated upstream (e.g. in chunks)
+      without holding every path in memory
+
+    Only the percentile bands are drawn, never the individual paths.
+    """
+    if bands is None:
+        if paths is None:
+            raise ValueError("Pass either paths or bands")
+        bands = np.nanpercentile(np.asarray(paths, dtype=float), percentiles, axis=0)
+    bands = np.asarray(bands, dtype=float)
+    if bands.ndim != 2 or len(bands) != len(percentiles):
+        raise ValueError("bands must have shape (len(percentiles), n_steps)")
+    steps = np.arange(bands.shape[1])
+
+    # pick points on the median so every band shares the same x positions
+    mid = len(percentiles) // 2
+    idx = lttb_indices(steps, bands[mid], max_points)
+    steps, bands = steps[idx], bands[:, idx]
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for k in range(mid):
+        ax.fill_between(
+            steps,
+            bands[k],
+            bands[-k - 1],
+            color=color,
+            alpha=0.15 + 0.15 * k,
+            linewidth=0,
+            label=f"P{percentiles[k]}–P{percentiles[-k - 1]}",
+        )
+    ax.plot(steps, bands[mid], color=color, label=f"P{percentiles[mid]}")
+    ax.set_title(title)
+    ax.grid()
+    ax.legend()
+    return _save(fig, out_path)
+
+
+def plot_param_heatmap(
+    grid_df,
+    out_path,
+    x="upper",
+    y="lower",
+    value="Sharpe",
+    agg="max",
+    cmap="viridis",
+):
+    """
+    Heatmap of a sweep metric over two parameters; any other parameters are
+    collapsed with `agg` (e.g. best Sharpe across stop/profit settings).
+
+    Parameters:
+    - grid_df: DataFrame like outputs/param_grid_full.csv or results_store.query_top
+      (one sweep config only; frames mixing configs are rejected)
+    """
+    if "config" in grid_df and grid_df["config"].nunique() > 1:
+        raise ValueError("grid_df mixes several sweep configs; filter to one first")
+    table = pd.pivot_table(grid_df, index=y, columns=x, values=value, aggfunc=agg)
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    im = ax.imshow(table.values, cmap=cmap, origin="lower", aspect="auto")
+    ax.set_xticks(range(len(table.columns)), labels=[f"{c:g}" for c in table.columns])
+    ax.set_yticks(range(len(table.index)), labels=[f"{r:g}" for r in table.index])
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.set_title(f"{value} ({agg}) by {x} × {y}")
+    fig.colorbar(im, ax=ax, label=value)
+    return _save(fig, out_path)
+
+
+# --------🚀 Parallel rendering --------
+def _use_agg():
+    matplotlib.use("Agg")
+
+
+def _render_job(job):
+    func, kwargs = job
+    return func(**kwargs)
+
+
+def render_reports_parallel(jobs, max_workers=None):
+    """
+    Renders several report figures in worker processes (Agg backend).
+
+    Parameters:
+    - jobs: list of (plot_function, kwargs) pairs, e.g.
+        [(plot_equity_curve, {"dates": d, "cum_pnl": c, "out_path": "..."}),
+         (plot_param_heatmap, {"grid_df": g, "out_path": "..."})]
+      plot functions must be module-level so they can be pickled
+    - max_workers: defaults to min(len(jobs), os.cpu_count())
+
+    With the spawn start method (default on macOS and Windows) each worker
+    re-imports the calling script, so call this from under
+    `if __name__ == "__main__":` and keep heavy work out of module level
+    there, otherwise every worker re-runs it.
+
+    Returns:
+    - list of saved paths, in job order
+    """
+    if not jobs:
+        return []
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_agg) as pool:
+        paths = list(pool.map(_render_job, jobs))
+
+    print(f"✅ Rendered {len(paths)} report figures")
+    return paths
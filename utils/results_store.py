@@ -0,0 +1,240 @@
+import datetime
+import hashlib
+import itertools
+import json
+import math
+import os
+import sqlite3
+import uuid
+
+import pandas as pd
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_DB_PATH = os.path.join(BASE_PATH, "outputs", "param_grid_results.sqlite")
+
+# Metrics stored as real columns so they can be filtered / sorted with indexes
+METRIC_COLUMNS = ("Sharpe", "TotalRet", "MaxDraw", "WinRate")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS grid_results (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id      TEXT NOT NULL,
+    data_hash   TEXT NOT NULL,
+    params_key  TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    config      TEXT NOT NULL,
+    Sharpe      REAL,
+    TotalRet    REAL,
+    MaxDraw     REAL,
+    WinRate     REAL,
+    created_at  TEXT NOT NULL,
+    UNIQUE (data_hash, params_key)
+);
+CREATE INDEX IF NOT EXISTS idx_grid_sharpe ON grid_results (data_hash, Sharpe);
+CREATE INDEX IF NOT EXISTS idx_grid_totalret ON grid_results (data_hash, TotalRet);
+CREATE INDEX IF NOT EXISTS idx_grid_maxdraw ON grid_results (data_hash, MaxDraw);
+CREATE INDEX IF NOT EXISTS idx_grid_winrate ON grid_results (data_hash, WinRate);
+CREATE INDEX IF NOT EXISTS idx_grid_run ON grid_results (run_id);
+"""
+
+
+def open_results_store(db_path=DEFAULT_DB_PATH):
+    """
+    Opens (or creates) the SQLite sweep results store.
+
+    Parameters:
+    - db_path: path of the .sqlite file
+
+    Returns:
+    - sqlite3.Connection with the grid_results schema in place
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    # WAL keeps readers (queries from another process) unblocked while a sweep writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def new_run_id():
+    """Unique id for one sweep invocation, e.g. 20250801T101500-1a2b3c4d."""
+    stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}-{uuid.uuid4().hex[:8]}"
+
+
+def compute_data_hash(data):
+    """
+    Stable content hash of the input data (pd.Series or pd.DataFrame).
+    Results are only reused for combinations evaluated on identical data.
+    """
+    hashed = pd.util.hash_pandas_object(data, index=True).values
+    return hashlib.sha256(hashed.tobytes()).hexdigest()[:16]
+
+
+def _normalize(values):
+    """Sorted plain-Python copy of a params/config dict (numpy scalars -> float)."""
+    return {k: v if isinstance(v, str) else float(v) for k, v in sorted(values.items())}
+
+
+def make_params_key(params, config=None):
+    """
+    Canonical string for a parameter dict (order-independent).
+    Fixed settings passed as `config` (hold period, costs, ...) are part of the
+    key, so changing them makes every combination count as not yet evaluated.
+    """
+    key = _normalize(params)
+    if config:
+        key = {"params": key, "config": _normalize(config)}
+    return json.dumps(key)
+
+
+def _to_sql_value(val):
+    try:
+        val = float(val)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(val) else val
+
+
+def record_result(conn, run_id, data_hash, params, metrics, config=None):
+    """
+    Checkpoints one evaluated parameter combination.
+
+    Parameters:
+    - conn: connection from open_results_store
+    - run_id: id of the current sweep
+    - data_hash: hash of the data the combination was evaluated on
+    - params: dict of parameter name -> value
+    - metrics: dict containing the keys in METRIC_COLUMNS
+    - config: optional dict of fixed settings (see make_params_key)
+
+    A combination already stored for the same data_hash (and config) is left
+    untouched, i.e. it stays attributed to the run that first evaluated it.
+    """
+    row = [_to_sql_value(metrics.get(col)) for col in METRIC_COLUMNS]
+    conn.execute(
+        f"INSERT OR IGNORE INTO grid_results "
+        f"(run_id, data_hash, params_key, params, config, {', '.join(METRIC_COLUMNS)}, created_at) "
+        f"VALUES (?, ?, ?, ?, ?, {', '.join('?' for _ in METRIC_COLUMNS)}, ?)",
+        [
+            run_id,
+            data_hash,
+            make_params_key(params, config),
+            json.dumps(_normalize(params)),
+            json.dumps(_normalize(config or {})),
+            *row,
+            datetime.datetime.now().isoformat(timespec="seconds"),
+        ],
+    )
+    conn.commit()
+
+
+def completed_params(conn, data_hash):
+    """Set of params_key already evaluated for this data_hash."""
+    cur = conn.execute(
+        "SELECT params_key FROM grid_results WHERE data_hash = ?", (data_hash,)
+    )
+    return {key for (key,) in cur}
+
+
+def run_resumable_grid(conn, run_id, data_hash, param_grid, evaluate, config=None):
+    """
+    Runs a full-factorial sweep, checkpointing each combination as it completes.
+    Combinations already in the store for data_hash are skipped, so an
+    interrupted sweep can simply be restarted.
+
+    Parameters:
+    - conn: connection from open_results_store
+    - run_id: id of the current sweep
+    - data_hash: hash of the input data (see compute_data_hash)
+    - param_grid: dict of parameter name -> list of values
+    - evaluate: callable(params dict) -> metrics dict
+    - config: optional dict of the fixed settings `evaluate` uses; stored
+      combinations are only reused when it matches
+
+    Returns:
+    - (evaluated, skipped) counts
+    """
+    done = completed_params(conn, data_hash)
+    names = list(param_grid)
+    evaluated = skipped = 0
+
+    for values in itertools.product(*(param_grid[n] for n in names)):
+        params = dict(zip(names, values))
+        if make_params_key(params, config) in done:
+            skipped += 1
+            continue
+        record_result(conn, run_id, data_hash, params, evaluate(params), config)
+        evaluated += 1
+
+    print(f"✅ Grid run {run_id}: {evaluated} evaluated, {skipped} resumed from store")
+    return evaluated, skipped
+
+
+def query_top(
+    conn,
+    metric="Sharpe",
+    n=10,
+    max_drawdown=None,
+    data_hash=None,
+    run_id=None,
+    config=None,
+):
+    """
+    Top-N combinations by `metric`, filtered in SQL (nothing else is loaded).
+
+    Parameters:
+    - metric: one of METRIC_COLUMNS to sort by (descending, NaN last)
+    - n: number of rows to return (None for all)
+    - max_drawdown: keep only rows with MaxDraw < max_drawdown
+    - data_hash: filter to one dataset; pass it so sweeps on different data
+      aren't mixed and the (data_hash, metric) indexes are used
+    - run_id: optional filter; combinations are stored once per data_hash
+      and config, so a rerun on the same data only owns the rows it actually
+      evaluated (skipped ones stay under the earlier run_id)
+    - config: fixed settings the sweep was run with; required when the
+      other filters match more than one config (rows from different
+      settings would otherwise be ranked together, and a heatmap would
+      aggregate across them)
+
+    Returns:
+    - pd.DataFrame with one column per parameter, then run_id, data_hash,
+      config (JSON string) and the metric columns
+    """
+    if metric not in METRIC_COLUMNS:
+        raise ValueError(f"Invalid metric. Use one of {METRIC_COLUMNS}.")
+
+    where, args = ["1 = 1"], []
+    if max_drawdown is not None:
+        where.append("MaxDraw < ?")
+        args.append(max_drawdown)
+    if data_hash is not None:
+        where.append("data_hash = ?")
+        args.append(data_hash)
+    if run_id is not None:
+        where.append("run_id = ?")
+        args.append(run_id)
+    if config is not None:
+        where.append("config = ?")
+        args.append(json.dumps(_normalize(config)))
+    else:
+        (n_configs,) = conn.execute(
+            f"SELECT COUNT(DISTINCT config) FROM grid_results "
+            f"WHERE {' AND '.join(where)}",
+            args,
+        ).fetchone()
+        if n_configs > 1:
+            raise ValueError(
+                f"{n_configs} different configs match; pass config= to pick one."
+            )
+
+    query = (
+        f"SELECT run_id, data_hash, config, params, {', '.join(METRIC_COLUMNS)} "
+        f"FROM grid_results WHERE {' AND '.join(where)} "
+        f"ORDER BY {metric} DESC LIMIT ?"
+    )
+    limit = -1 if n is None else int(n)
+    df = pd.read_sql_query(query, conn, params=[*args, limit])
+
+    params = pd.DataFrame([json.loads(p) for p in df.pop("params")], index=df.index)
+    return pd.concat([params, df], axis=1)
@@ -1,62 +1,386 @@
 import datetime
+import math
 import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 import yfinance as yf
 
 BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_PATH, "data", "parsed_iv_data")
+DEFAULT_IV_DB_PATH = os.path.join(CACHE_DIR, "spy_iv.sqlite")
 
+SNAPSHOT_COLUMNS = [
+    "date",
+    "spot",
+    "atm_strike",
+    "ce_iv",
+    "pe_iv",
+    "ce_price",
+    "pe_price",
+]
 
-def fetch_spy_atm_iv_premium(as_of_date=None):
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS iv_snapshots (
+    date        TEXT PRIMARY KEY,
+    spot        REAL,
+    atm_strike  REAL,
+    ce_iv       REAL,
+    pe_iv       REAL,
+    ce_price    REAL,
+    pe_price    REAL
+);
+CREATE TABLE IF NOT EXISTS iv_no_data (
+    date        TEXT PRIMARY KEY,
+    reason      TEXT
+);
+"""
+
+
+class NoDataError(Exception):
     """
-    Fetches SPY’s ATM implied vol and premium for the nearest expiry.
-    Caches daily results under data/parsed_iv_data/spy_iv_YYYY-MM-DD.csv
-    """
-    # 1. Date
-    today = as_of_date or datetime.date.today()
-    date_str = today.strftime("%Y-%m-%d")
-
-    # 2. Check cache
-    cache_dir = os.path.join(BASE_PATH, "data", "parsed_iv_data")
-    os.makedirs(cache_dir, exist_ok=True)
-    cache_path = os.path.join(cache_dir, f"spy_iv_{date_str}.csv")
-    if os.path.exists(cache_path):
-        return pd.read_csv(cache_path, index_col=0, parse_dates=True)
-
-    # 3. Fetch underlying & expiries
-    ticker = yf.Ticker("SPY")
-    spot = ticker.history(start=date_str, end=date_str).Close.iloc[-1]
+    Raised by a provider when a day has no data at all (holiday, no close).
+    Backfills record such days and skip them on later runs.
+    """
+
+
+# --------💾 Store --------
+def open_iv_store(db_path=DEFAULT_IV_DB_PATH):
+    """
+    Opens (or creates) the single SQLite time-series store of daily ATM
+    snapshots, keyed (and indexed) by date.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def validate_snapshot(snapshot, expected_date=None):
+    """
+    Coerces a provider snapshot to a store row (date string + floats).
+    Raises ValueError if a field is missing or not a finite number, or if
+    the snapshot is for a different day than `expected_date`.
+    """
+    row = {"date": _date_str(snapshot["date"])}
+    if expected_date is not None and row["date"] != _date_str(expected_date):
+        raise ValueError(f"Snapshot dated {row['date']}, expected {expected_date}")
+
+    for col in SNAPSHOT_COLUMNS[1:]:
+        try:
+            val = float(snapshot[col])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid {col}: {snapshot.get(col)!r}")
+        if not math.isfinite(val):
+            raise ValueError(f"Invalid {col}: {val}")
+        row[col] = val
+    return row
+
+
+def save_snapshots(conn, snapshots):
+    """Upserts a list of snapshot dicts (keys = SNAPSHOT_COLUMNS)."""
+    if not snapshots:
+        return
+    rows = [validate_snapshot(s) for s in snapshots]
+    conn.executemany(
+        f"INSERT OR REPLACE INTO iv_snapshots ({', '.join(SNAPSHOT_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in SNAPSHOT_COLUMNS)})",
+        [[r[c] for c in SNAPSHOT_COLUMNS] for r in rows],
+    )
+    conn.commit()
+
+
+def stored_dates(conn, start, end):
+    """Set of 'YYYY-MM-DD' dates already in the store within [start, end]."""
+    cur = conn.execute(
+        "SELECT date FROM iv_snapshots WHERE date BETWEEN ? AND ?",
+        (_date_str(start), _date_str(end)),
+    )
+    return {d for (d,) in cur}
+
+
+def no_data_dates(conn, start, end):
+    """Set of dates within [start, end] a provider reported as having no data."""
+    cur = conn.execute(
+        "SELECT date FROM iv_no_data WHERE date BETWEEN ? AND ?",
+        (_date_str(start), _date_str(end)),
+    )
+    return {d for (d,) in cur}
+
+
+def import_legacy_snapshots(conn, dates):
+    """
+    Moves older per-day spy_iv_YYYY-MM-DD.csv caches for `dates` into the
+    store. Returns the set of dates imported.
+    """
+    imported = set()
+    for date_str in dates:
+        legacy_path = os.path.join(CACHE_DIR, f"spy_iv_{date_str}.csv")
+        if os.path.exists(legacy_path):
+            save_snapshots(conn, [pd.read_csv(legacy_path).iloc[0].to_dict()])
+            imported.add(date_str)
+    return imported
+
+
+def _date_str(day):
+    return pd.Timestamp(day).strftime("%Y-%m-%d")
+
+
+# --------📡 Providers --------
+def yfinance_provider(as_of_date, symbol="SPY"):
+    """
+    Default provider: ATM implied vol and premium for the nearest expiry.
+
+    A provider is any callable(date) -> dict with SNAPSHOT_COLUMNS keys, so
+    backfills can be pointed at another vendor (or a local stub) instead.
+    yfinance only serves the *current* option chains, so any date other than
+    today raises; backfills of past dates need a provider with historical
+    chains.
+    """
+    day = pd.Timestamp(as_of_date).date()
+    date_str = day.strftime("%Y-%m-%d")
+    if day != datetime.date.today():
+        raise ValueError(
+            f"yfinance has no historical option chains for {date_str}; "
+            "pass a provider with historical data"
+        )
+    next_day = (day + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+    ticker = yf.Ticker(symbol)
     expiries = ticker.options
     if not expiries:
-        raise Exception("No expiries found for SPY")
+        raise Exception(f"No expiries found for {symbol}")
 
-    # 4. Use the nearest expiry after as_of_date
+    # Use the nearest expiry on/after as_of_date
     expiry_dates = [datetime.datetime.strptime(e, "%Y-%m-%d").date() for e in expiries]
-    expiry = min((e for e in expiry_dates if e >= today), default=expiry_dates[0])
-    chain = ticker.option_chain(expiry.strftime("%Y-%m-%d"))
-    calls, puts = chain.calls, chain.puts
+    expiry = min((e for e in expiry_dates if e >= day), default=expiry_dates[0])
+
+    # Spot and chain are independent requests, so fetch them together
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        hist = pool.submit(ticker.history, start=date_str, end=next_day)
+        chain = pool.submit(ticker.option_chain, expiry.strftime("%Y-%m-%d"))
+        closes = hist.result().Close
+        calls, puts = chain.result().calls, chain.result().puts
 
-    # 5. Find ATM strike
+    if closes.empty:
+        raise NoDataError(f"No {symbol} close for {date_str}")
+    spot = closes.iloc[-1]
+
+    # Find ATM strike
     strikes = calls["strike"]
     atm = strikes.iloc[(abs(strikes - spot)).argmin()]
 
     ce = calls[calls["strike"] == atm].iloc[0]
     pe = puts[puts["strike"] == atm].iloc[0]
 
-    # 6. Build df & cache
-    df = pd.DataFrame(
-        [
-            {
-                "date": date_str,
-                "spot": spot,
-                "atm_strike": atm,
-                "ce_iv": ce["impliedVolatility"],
-                "pe_iv": pe["impliedVolatility"],
-                "ce_price": ce["lastPrice"],
-                "pe_price": pe["lastPrice"],
-            }
+    return {
+        "date": date_str,
+        "spot": spot,
+        "atm_strike": atm,
+        "ce_iv": ce["impliedVolatility"],
+        "pe_iv": pe["impliedVolatility"],
+        "ce_price": ce["lastPrice"],
+        "pe_price": pe["lastPrice"],
+    }
+
+
+def frame_provider(frame):
+    """
+    Provider backed by a DataFrame of snapshots already on hand (a vendor
+    export, a CSV of historical chains, or a stub for local runs).
+
+    Parameters:
+    - frame: DataFrame with SNAPSHOT_COLUMNS; `date` may be a column or the
+      index
+
+    Returns:
+    - callable(date_str) -> snapshot dict; a gap inside the frame's date
+      span raises NoDataError (holiday), a date outside it raises KeyError
+      so it is retried once more data is available
+
+    Example:
+        snaps = pd.read_csv("spy_chain_history.csv")
+        backfill_spy_iv("2024-01-01", "2024-06-30", provider=frame_provider(snaps))
+    """
+    frame = frame.reset_index() if "date" not in frame.columns else frame
+    rows = {_date_str(r["date"]): r for r in frame.to_dict("records")}
+    first, last = (min(rows), max(rows)) if rows else ("", "")
+
+    def provider(as_of_date):
+        date_str = _date_str(as_of_date)
+        if date_str not in rows:
+            if first <= date_str <= last:
+                raise NoDataError(f"No snapshot for {date_str}")
+            raise KeyError(f"{date_str} is outside the frame ({first} to {last})")
+        return {**rows[date_str], "date": date_str}
+
+    return provider
+
+
+# --------🚀 Single day --------
+def fetch_spy_atm_iv_premium(
+    as_of_date=None, provider=yfinance_provider, db_path=DEFAULT_IV_DB_PATH
+):
+    """
+    Fetches SPY’s ATM implied vol and premium for the nearest expiry.
+    Caches daily results in the IV store (data/parsed_iv_data/spy_iv.sqlite);
+    older per-day spy_iv_YYYY-MM-DD.csv caches are migrated on first read.
+    """
+    date_str = _date_str(as_of_date or datetime.date.today())
+    conn = open_iv_store(db_path)
+    try:
+        if date_str not in stored_dates(conn, date_str, date_str):
+            if not import_legacy_snapshots(conn, [date_str]):
+                save_snapshots(conn, [provider(date_str)])
+                print(f"✅ SPY IV+premium saved for {date_str}")
+
+        return pd.read_sql_query(
+            "SELECT * FROM iv_snapshots WHERE date = ?", conn, params=(date_str,)
+        ).set_index("date")
+    finally:
+        conn.close()
+
+
+# --------📚 Backfill --------
+def backfill_spy_iv(
+    start,
+    end,
+    provider=yfinance_provider,
+    max_workers=8,
+    db_path=DEFAULT_IV_DB_PATH,
+    holidays=None,
+    retry_no_data=False,
+):
+    """
+    Fills the IV store for every business day in [start, end] that is not
+    already stored, fetching missing days concurrently.
+
+    Parameters:
+    - start, end: date-likes (inclusive)
+    - provider: callable(date_str) -> snapshot dict. The default
+      yfinance_provider only covers today; for past dates pass one with
+      historical chains, e.g. frame_provider(df) over a vendor export
+    - max_workers: threads used for provider calls
+    - holidays: optional list of exchange holidays to leave out of the range
+    - retry_no_data: also retry days a provider earlier reported as having
+      no data (NoDataError); those are skipped by default
+
+    Returns:
+    - list of 'YYYY-MM-DD' dates that could not be fetched. Weekdays are
+      taken as trading days, so exchange holidays not passed in `holidays`
+      show up here on the first run (recorded as no-data afterwards if the
+      provider raises NoDataError for them)
+
+    Legacy per-day CSV caches are imported first. Each snapshot is validated
+    and saved as soon as it arrives, so an interrupted backfill keeps the
+    days already fetched and a bad row only fails its own day.
+    """
+    conn = open_iv_store(db_path)
+    try:
+        days = [
+            _date_str(d)
+            for d in pd.bdate_range(start, end, freq="C", holidays=holidays or [])
         ]
-    ).set_index("date")
-    df.to_csv(cache_path)
-    print(f"✅ SPY IV+premium saved to {cache_path}")
-    return df
+        have = stored_dates(conn, start, end)
+        have |= import_legacy_snapshots(conn, [d for d in days if d not in have])
+        if not retry_no_data:
+            have |= no_data_dates(conn, start, end)
+        missing = [d for d in days if d not in have]
+        if not missing:
+            return []
+
+        saved, failed = 0, []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(provider, d): d for d in missing}
+            for fut in as_completed(futures):
+                day = futures[fut]
+                try:
+                    snapshot = validate_snapshot(fut.result(), expected_date=day)
+                except NoDataError as e:
+                    failed.append(day)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO iv_no_data (date, reason) VALUES (?, ?)",
+                        (day, str(e)),
+                    )
+                    conn.commit()
+                    print(f"❌ {day}: {e} (skipped on later runs)")
+                    continue
+                except Exception as e:
+                    failed.append(day)
+                    print(f"❌ {day}: {e}")
+                    continue
+                # Writes stay on this thread; sqlite connections aren't shared
+                save_snapshots(conn, [snapshot])
+                conn.execute("DELETE FROM iv_no_data WHERE date = ?", (day,))
+                saved += 1
+
+        print(f"✅ Backfilled {saved} days, {len(failed)} failed")
+        return sorted(failed)
+    finally:
+        conn.close()
+
+
+def load_iv_premium_series(
+    start=None, end=None, align_to=None, db_path=DEFAULT_IV_DB_PATH
+):
+    """
+    Reads IV and straddle premium for a date range in one query.
+
+    Parameters:
+    - start, end: optional date bounds (inclusive)
+    - align_to: optional DatetimeIndex (e.g. close_prices.index); series are
+      reindexed onto it by calendar day (intraday / tz-aware stamps are
+      matched on their local date) and forward-filled from earlier snapshots
+
+    Returns:
+    - (iv, premium): float pd.Series of ATM IV (mean of call/put, decimal)
+      and straddle premium (call + put price), indexed by date (or align_to).
+      When aligning, each series' attrs lists (and a warning prints)
+      "filled_dates" (forward-filled from an earlier day) and
+      "missing_dates" (before the first snapshot, left NaN; passing NaN
+      premiums to simulate_straddle_payoff gives NaN PnL on those days)
+    """
+    if align_to is not None:
+        align_to = pd.DatetimeIndex(align_to)
+        align_days = align_to.tz_localize(None) if align_to.tz else align_to
+        align_days = align_days.normalize()
+        if end is None:
+            end = align_days.max()
+
+    conn = open_iv_store(db_path)
+    try:
+        df = pd.read_sql_query(
+            "SELECT date, ce_iv, pe_iv, ce_price, pe_price FROM iv_snapshots "
+            "WHERE date BETWEEN ? AND ? ORDER BY date",
+            conn,
+            params=(_date_str(start or "1900-01-01"), _date_str(end or "2999-12-31")),
+            parse_dates=["date"],
+            index_col="date",
+        )
+    finally:
+        conn.close()
+
+    df = df.astype(float)
+    df.index = pd.DatetimeIndex(df.index)
+    iv = ((df["ce_iv"] + df["pe_iv"]) / 2).rename("iv")
+    premium = (df["ce_price"] + df["pe_price"]).rename("premium")
+
+    if align_to is not None:
+        own = iv.reindex(align_days).notna().to_numpy()
+        iv = iv.reindex(align_days).ffill().set_axis(align_to)
+        premium = premium.reindex(align_days).ffill().set_axis(align_to)
+
+        gaps = {
+            "filled_dates": align_days[~own & iv.notna().to_numpy()],
+            "missing_dates": align_days[iv.isna().to_numpy()],
+        }
+        for key, days in gaps.items():
+            dates = sorted({_date_str(d) for d in days})
+            iv.attrs[key] = premium.attrs[key] = dates
+            if dates:
+                shown = ", ".join(dates[:10]) + (" …" if len(dates) > 10 else "")
+                what = "forward-filled" if key == "filled_dates" else "left NaN"
+                print(f"⚠️ {len(dates)} dates had no IV snapshot ({what}): {shown}")
+
+    return iv, premium